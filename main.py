@@ -2,35 +2,200 @@ import tkinter as tk
 from tkinter import scrolledtext, ttk, font
 import re
 import os
+import sys
+import pickle
+from collections import defaultdict
+import functools
+import heapq
+import threading
 import Levenshtein
 
+class BKTree:
+    def __init__(self, words=(), root=None):
+        """Build a BK-tree over Levenshtein distance from the given words or an existing root node."""
+        self.root = root
+        for word in words:
+            self.add(word)
+            
+    def add(self, word):
+        """Insert a word into the tree."""
+        if self.root is None:
+            self.root = (word, {})
+            return
+            
+        node = self.root
+        while True:
+            distance = Levenshtein.distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+            
+    def find(self, word, max_distance):
+        """Find all (word, distance) pairs within max_distance of a word."""
+        found = []
+        if self.root is None:
+            return found
+            
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            
+            # A distance beyond max_distance plus the longest edge can neither match
+            # nor reach a matching child, so the DP may stop as soon as it exceeds it
+            cutoff = max_distance + max(children, default=0)
+            distance = Levenshtein.distance(word, node_word, score_cutoff=cutoff)
+            if distance > cutoff:
+                continue
+            if distance <= max_distance:
+                found.append((node_word, distance))
+                
+            # By the triangle inequality only children whose edge lies within
+            # max_distance of this node's distance can contain matches
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+                    
+        return found
+
 class ArabicSpellChecker:
+    INDEX_CACHE_VERSION = 1  # Bump whenever normalization, Soundex or the index layout changes
+    
     def __init__(self, word_list_path):
         """Initialize the spell checker with a word list."""
-        self.word_list = self.load_word_list(word_list_path)
-        self.word_list = {self.normalize_text(word) for word in self.word_list}
+        # Compiled once so preprocessing is a single pass per step
+        self._norm_table = str.maketrans({
+            'ى': 'ي',  # Replace Alif Maksura with Ya
+            'ة': 'ه',  # Replace Ta Marbuta with Ha
+            'أ': 'ا',  # Replace Hamza-Alif with Alif
+            'إ': 'ا',  # Replace Hamza-Alif with Alif
+            'آ': 'ا',  # Replace Madda-Alif with Alif
+        })
+        self._diacritics_re = re.compile(r'[\u064B-\u065F]')
+        self._token_re = re.compile(r'[\u0600-\u06FF]+')
+        
+        # Arabic Soundex codes: weak letters map to 0 and are dropped from the code
+        self._soundex_codes = {}
+        for code, chars in enumerate([
+            'اأإآءؤئحعهةويى',
+            'بف',
+            'خجزسصظقكغشگ',
+            'تثدذضط',
+            'ل',
+            'من',
+            'ر'
+        ]):
+            for char in chars:
+                self._soundex_codes[char] = str(code)
+        
+        # Misspellings repeat a lot, so suggestions are cached per (word, max_suggestions)
+        self._cached_suggestions = functools.lru_cache(maxsize=4096)(self._find_suggestions)
+        
+        # Building the indexes dominates start-up, so reuse them from disk when possible
+        indexes = self.load_index_cache(word_list_path)
+        if indexes is None:
+            self.word_list = self.load_word_list(word_list_path)
+            self.build_indexes()
+            self.save_index_cache(word_list_path)
+        else:
+            self.word_list, bk_roots, soundex_root = indexes
+            self._bk = {block: BKTree(root=root) for block, root in bk_roots.items()}
+            self._soundex_bk = BKTree(root=soundex_root)
+        
+        # Map each character to a bitmask of the groups it belongs to, since
+        # a character (e.g. 'ه') can appear in more than one group
+        self._group = {}
+        for group_id, group in enumerate(self.get_character_groups()):
+            for char in group:
+                self._group[char] = self._group.get(char, 0) | (1 << group_id)
+        self._phonetic_adjust = -0.5  # Adjustment for a mismatch between similar characters
         
     def load_word_list(self, path):
-        """Load Arabic words from a text file."""
+        """Load Arabic words from a text file, normalized the same way as input text."""
         try:
             with open(path, 'r', encoding='utf-8') as file:
-                return set([line.strip() for line in file if line.strip()])
+                content = file.read()
         except FileNotFoundError:
             print(f"Error: Word list file not found at {path}")
-            return set()
+            return frozenset()
+            
+        # Clean the whole file at once instead of line by line; the words live
+        # as long as the app and are referenced by every index, so intern them
+        content = self.normalize_text(self.remove_diacritics(content))
+        return frozenset(sys.intern(line.strip()) for line in content.splitlines() if line.strip())
+            
+    def build_indexes(self):
+        """Build the BK-tree indexes over the word list."""
+        # One BK-tree per (Soundex code, word length) block, so only phonetically
+        # close words within the edit radius are ever compared with the input
+        blocks = defaultdict(list)
+        for word in self.word_list:
+            blocks[(self.arabic_soundex(word), len(word))].append(word)
+        self._bk = {block: BKTree(words) for block, words in blocks.items()}
+        self._soundex_bk = BKTree({code for code, _ in blocks})
+        
+    def get_index_cache_path(self, word_list_path):
+        """Get the path of the index cache stored next to the word list."""
+        return os.path.splitext(word_list_path)[0] + '.pkl'
+        
+    def load_index_cache(self, word_list_path):
+        """Load the cached word list and indexes, or None if the cache is missing or stale."""
+        cache_path = self.get_index_cache_path(word_list_path)
+        try:
+            if os.path.getmtime(cache_path) < os.path.getmtime(word_list_path):
+                return None
+            with open(cache_path, 'rb') as file:
+                version, indexes = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+            
+        return indexes if version == self.INDEX_CACHE_VERSION else None
+        
+    def save_index_cache(self, word_list_path):
+        """Save the word list and indexes next to the word list for faster start-up."""
+        if not os.path.exists(word_list_path):
+            return
+            
+        # The trees are stored as plain nodes so the cache does not depend on
+        # the module BKTree is loaded from (e.g. __main__ versus main)
+        indexes = (
+            self.word_list,
+            {block: tree.root for block, tree in self._bk.items()},
+            self._soundex_bk.root
+        )
+        cache_path = self.get_index_cache_path(word_list_path)
+        temp_path = cache_path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                pickle.dump((self.INDEX_CACHE_VERSION, indexes), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass  # The cache is only an optimization, e.g. the directory may be read-only
             
     def remove_diacritics(self, text):
         """Remove Arabic diacritics from text."""
-        return re.sub(r'[\u064B-\u065F]', '', text)
+        return self._diacritics_re.sub('', text)
         
     def normalize_text(self, text):
         """Normalize Arabic text by replacing certain characters."""
-        text = text.replace('ى', 'ي')  # Replace Alif Maksura with Ya
-        text = text.replace('ة', 'ه')  # Replace Ta Marbuta with Ha
-        text = text.replace('أ', 'ا')  # Replace Hamza-Alif with Alif
-        text = text.replace('إ', 'ا')  # Replace Hamza-Alif with Alif
-        text = text.replace('آ', 'ا')  # Replace Madda-Alif with Alif
-        return text
+        return text.translate(self._norm_table)
+        
+    def arabic_soundex(self, word):
+        """Get the Arabic Soundex code of a word: the digits of its consonants."""
+        # Unlike classic Soundex the first letter is coded too and the code is not
+        # truncated, so a prefix such as 'ا' or 'و' only changes the code by one edit
+        digits = []
+        previous = None
+        for char in word:
+            code = self._soundex_codes.get(char)
+            if code != previous and code not in (None, '0'):
+                digits.append(code)
+            previous = code
+            
+        return ''.join(digits)
         
     def get_character_groups(self):
         """Get groups of similar Arabic characters that are commonly confused."""
@@ -52,75 +217,105 @@ class ArabicSpellChecker:
         if char1 == char2:
             return 0
             
-        char_groups = self.get_character_groups()
-        
-        for group in char_groups:
-            if char1 in group and char2 in group:
-                return 0.5  
+        if self._group.get(char1, 0) & self._group.get(char2, 0):
+            return 0.5  
         
         return 1  
         
-    def custom_distance(self, word1, word2):
-        """Calculate a custom distance between two words considering Arabic phonetics."""
-        # First use basic Levenshtein as a base
-        base_distance = Levenshtein.distance(word1, word2)
+    def common_prefix_length(self, word1, word2):
+        """Count the characters shared at the start of two words."""
+        min_len = min(len(word1), len(word2))
+        length = 0
+        while length < min_len and word1[length] == word2[length]:
+            length += 1
+        return length
         
-        # Then apply phonetic adjustments
-        phonetic_adjustment = 0
+    def common_suffix_length(self, word1, word2):
+        """Count the characters shared at the end of two words."""
         min_len = min(len(word1), len(word2))
+        length = 0
+        while length < min_len and word1[-length - 1] == word2[-length - 1]:
+            length += 1
+        return length
+        
+    def phonetic_adjustment(self, word1, word2, prefix_length=0):
+        """Calculate the distance adjustment for mismatches between similar Arabic characters."""
+        # Only mismatches between similar characters change the distance, different
+        # characters cost exactly 1; positions in the shared prefix never mismatch
+        group = self._group
+        similar_mismatches = sum(
+            1 for char1, char2 in zip(word1[prefix_length:], word2[prefix_length:])
+            if char1 != char2 and group.get(char1, 0) & group.get(char2, 0)
+        )
+        return similar_mismatches * self._phonetic_adjust
         
-        for i in range(min_len):
-            if word1[i] != word2[i]:
-                phonetic_adjustment += self.calculate_phonetic_distance(word1[i], word2[i]) - 1
+    def custom_distance(self, word1, word2):
+        """Calculate a custom distance between two words considering Arabic phonetics."""
+        prefix_length = self.common_prefix_length(word1, word2)
+        suffix_length = self.common_suffix_length(word1, word2)
+        
+        # The common prefix and suffix never add edits, so only the differing
+        # middles go through Levenshtein; the suffix must not overlap the prefix
+        suffix_length = min(suffix_length, min(len(word1), len(word2)) - prefix_length)
+        base_distance = Levenshtein.distance(
+            word1[prefix_length:len(word1) - suffix_length],
+            word2[prefix_length:len(word2) - suffix_length]
+        )
         
         # Adjust the base distance
-        adjusted_distance = max(0, base_distance + phonetic_adjustment)
+        adjusted_distance = max(0, base_distance + self.phonetic_adjustment(word1, word2, prefix_length))
         return adjusted_distance
         
     def get_suggestions(self, word, max_suggestions=3):
         """Find suggested corrections for a word using enhanced distance metrics."""
+        return list(self._cached_suggestions(word, max_suggestions))
+        
+    def _find_suggestions(self, word, max_suggestions):
+        """Score the dictionary against a word and return the best suggestions as a tuple."""
         suggestions = []
         word_len = len(word)
         
-        # Prefer words of similar length
-        for dict_word in self.word_list:
+        # Values that only depend on the input word are computed once, not per dictionary word
+        max_distance = min(3, word_len // 2 + 1)  # Edit radius, also bounds the length difference
+        word_norm = max(word_len, 1)
+        phonetic_adjustment = self.phonetic_adjustment
+        common_prefix_length = self.common_prefix_length
+        common_suffix_length = self.common_suffix_length
+        
+        # Only words whose Soundex code is within one edit of the input's code
+        # and whose distance is within the edit radius are scored
+        candidates = []
+        for code, _ in self._soundex_bk.find(self.arabic_soundex(word), 1):
+            for length in range(word_len - max_distance, word_len + max_distance + 1):
+                tree = self._bk.get((code, length))
+                if tree:
+                    candidates.extend(tree.find(word, max_distance))
+        
+        for dict_word, distance in candidates:
             dict_word_len = len(dict_word)
             
-            # Skip words with very different lengths
-            if abs(word_len - dict_word_len) > min(3, word_len // 2 + 1):
-                continue
-                
-            # Calculate custom distance that considers Arabic phonetics
-            adjusted_distance = self.custom_distance(word, dict_word)
+            prefix_length = common_prefix_length(word, dict_word)
+            suffix_length = common_suffix_length(word, dict_word)
+            
+            # Custom distance that considers Arabic phonetics; the search already
+            # computed the exact Levenshtein distance, so it is not run again
+            adjusted_distance = max(0, distance + phonetic_adjustment(word, dict_word, prefix_length))
             
             # Apply length-based normalization
+            min_len = min(word_len, dict_word_len)
             max_len = max(word_len, dict_word_len)
             if max_len > 0:
                 normalized_distance = adjusted_distance / max_len
             else:
                 normalized_distance = adjusted_distance
             
-            prefix_length = 0
-            for i in range(min(word_len, dict_word_len)):
-                if word[i] == dict_word[i]:
-                    prefix_length += 1
-                else:
-                    break
-            
-            suffix_length = 0
-            for i in range(1, min(word_len, dict_word_len) + 1):
-                if word_len >= i and dict_word_len >= i and word[-i] == dict_word[-i]:
-                    suffix_length += 1
-                else:
-                    break
-            
             # Root matching is particularly important in Arabic
             # More weight to prefix since Arabic words often share roots at the beginning
-            prefix_bonus = prefix_length / max(word_len, 1) if prefix_length > 1 else 0
-            suffix_bonus = suffix_length / max(word_len, 1) if suffix_length > 1 else 0
+            prefix_bonus = prefix_length / word_norm if prefix_length > 1 else 0
+            suffix_bonus = suffix_length / word_norm if suffix_length > 1 else 0
             
             # Length similarity (closer to 1 is better)
-            length_ratio = min(word_len, dict_word_len) / max(word_len, dict_word_len) if max_len > 0 else 0
+            length_ratio = min_len / max_len if max_len > 0 else 0
             
             # Calculate final weighted score
             weighted_score = (
@@ -136,32 +331,29 @@ class ArabicSpellChecker:
             
             suggestions.append((dict_word, weighted_score))
         
-        # Sort by weighted score (lower is better) and take top suggestions
-        suggestions.sort(key=lambda x: x[1])
-        return [word for word, _ in suggestions[:max_suggestions]]
+        # Take the top suggestions by weighted score (lower is better) without sorting them all
+        best = heapq.nsmallest(max_suggestions, suggestions, key=lambda x: x[1])
+        return tuple(word for word, _ in best)
         
     def check_text(self, text):
-        """Check spelling in a text and return misspelled words with suggestions."""
-        # Preprocess text
+        """Check spelling in a text and return (misspelled word, suggestions) pairs in text order."""
+        # Preprocess text: remove diacritics and normalize in one pass each
         text = self.remove_diacritics(text)
         text = self.normalize_text(text)
         
-        # Split text into words
-        words = text.split()
+        # Runs of Arabic characters are the words, so one scan both splits the
+        # text and drops spaces, punctuation and non-Arabic characters
+        words = self._token_re.findall(text)
+        
+        # Find all unknown words with a single set difference
+        unknown = set(words).difference(self.word_list)
         
-        # Check each word
-        misspelled = {}
+        # Check each unknown word once, in the order it first appears
+        misspelled = []
         for word in words:
-            # Skip empty words or punctuation-only words
-            if not word or not re.search(r'[\u0600-\u06FF]', word):
-                continue
-                
-            # Remove punctuation
-            clean_word = re.sub(r'[^\u0600-\u06FF]', '', word)
-            
-            if clean_word and clean_word not in self.word_list:
-                suggestions = self.get_suggestions(clean_word)
-                misspelled[word] = suggestions
+            if word in unknown:
+                unknown.remove(word)
+                misspelled.append((word, self.get_suggestions(word)))
                 
         return misspelled
 
@@ -277,13 +469,13 @@ class SpellCheckerApp:
         button_frame.pack(fill=tk.X, pady=10)
         
         # Check button with modern styling
-        check_button = ttk.Button(
+        self.check_button = ttk.Button(
             button_frame, 
             text="Check Spelling", 
             command=self.check_spelling,
             style="TButton"
         )
-        check_button.pack(pady=10)
+        self.check_button.pack(pady=10)
         
         # Separator
         separator = ttk.Separator(main_container, orient='horizontal')
@@ -320,15 +512,25 @@ class SpellCheckerApp:
             self.update_result("Please enter some text to check.")
             return
             
-        # Check spelling
+        # Check spelling in the background so the window stays responsive
+        self.check_button.configure(state='disabled')
+        threading.Thread(target=self.run_check, args=(text,), daemon=True).start()
+        
+    def run_check(self, text):
+        """Run the spell checker off the main thread and hand the results back to Tk."""
         misspelled = self.spell_checker.check_text(text)
+        self.root.after(0, self.show_results, text, misspelled)
+        
+    def show_results(self, text, misspelled):
+        """Display the spell checking results and re-enable the check button."""
+        self.check_button.configure(state='normal')
         
         # Display results
         if not misspelled:
             result = "No spelling errors found!"
         else:
             result = f"Original text: {text}\n\nMisspelled words:\n"
-            for word, suggestions in misspelled.items():
+            for word, suggestions in misspelled:
                 result += f"\n• {word}:\n"
                 if suggestions:
                     result += f"  Suggestions: {', '.join(suggestions)}"